@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from weather_cache import city_key
+
+
+def advice_key(species, temp, humidity, city):
+    if temp is None: temp = 25
+    if humidity is None: humidity = 50
+    # Cubetas: 2 °C y 10 % de humedad comparten el mismo consejo
+    return (
+        ' '.join((species or '').split()).casefold(),
+        int(temp // 2),
+        int(humidity // 10),
+        city_key(city)[1],
+    )
+
+
+class TTLCache:
+    def __init__(self, ttl=3600, max_entries=2048, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self.clock() - entry[1] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AdviceEngine:
+    """Memoized, batched and deadline-bounded plant advice.
+
+    `batch_fn(items)` receives a list of (key, species, temp, humidity, city)
+    tuples and returns a dict mapping key -> tip (missing keys are allowed).
+    `fallback_fn(species, temp, humidity, city)` must be cheap and local; it
+    fills in anything the batch did not answer before the deadline.
+
+    At most `max_pending` batches are queued or running at once; beyond that
+    new keys go straight to the fallback. A queued batch whose every waiter
+    has passed its deadline is cancelled before it reaches `batch_fn`.
+    """
+
+    def __init__(self, batch_fn, fallback_fn, batch_size=20, max_workers=4, deadline=2.5, ttl=3600, max_entries=2048,
+                 max_pending=None):
+        self.batch_fn = batch_fn
+        self.fallback_fn = fallback_fn
+        self.batch_size = batch_size
+        self.deadline = deadline
+        self.max_pending = max_workers * 4 if max_pending is None else max_pending
+        self.cache = TTLCache(ttl=ttl, max_entries=max_entries)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='advice')
+        self._inflight = {}
+        self._waiters = {}
+        self._batches = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def advise(self, requests, deadline=None):
+        """Return one tip per (species, temp, humidity, city) in `requests`."""
+        results = [None] * len(requests)
+        for i, tip in self.iter_advice(requests, deadline):
+            results[i] = tip
+        return results
+
+    def iter_advice(self, requests, deadline=None):
+        """Yield (index, tip) pairs as soon as each tip is available.
+
+        Cached tips come first, then batches in completion order; whatever is
+        still missing when the deadline passes is filled with the fallback.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        positions = {}
+        for i, r in enumerate(requests):
+            positions.setdefault(advice_key(*r), []).append(i)
+        pending = {}
+        for key, indexes in positions.items():
+            cached = self.cache.get(key)
+            if cached is None:
+                pending[key] = requests[indexes[0]]
+                continue
+            for i in indexes:
+                yield i, cached
+        if not pending:
+            return
+
+        futures = self._submit(pending)
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                answered = future.result()
+                for key in [k for k in pending if k in answered]:
+                    del pending[key]
+                    for i in positions[key]:
+                        yield i, answered[key]
+        except TimeoutError:
+            pass
+        finally:
+            self._release(futures)
+        for key, r in pending.items():
+            tip = self.fallback_fn(*r)
+            for i in positions[key]:
+                yield i, tip
+
+    def _submit(self, pending):
+        futures = set()
+        missing = []
+        with self._lock:
+            for key, r in pending.items():
+                future = self._inflight.get(key)
+                if future is not None:
+                    futures.add(future)
+                else:
+                    missing.append((key,) + tuple(r))
+            for i in range(0, len(missing), self.batch_size):
+                if self._batches >= self.max_pending:
+                    # Cola llena: estas claves usan el fallback en lugar de esperar turno
+                    self.dropped += len(missing) - i
+                    break
+                chunk = missing[i:i + self.batch_size]
+                future = self.executor.submit(self._run_batch, chunk)
+                future.chunk = chunk
+                self._batches += 1
+                for item in chunk:
+                    self._inflight[item[0]] = future
+                futures.add(future)
+            for future in futures:
+                self._waiters[future] = self._waiters.get(future, 0) + 1
+        return futures
+
+    def _release(self, futures):
+        with self._lock:
+            for future in futures:
+                waiters = self._waiters.pop(future, 1) - 1
+                if waiters > 0:
+                    self._waiters[future] = waiters
+                elif future.cancel():
+                    # Nadie espera ya este lote y aún no empezó: no llega a OpenAI
+                    self._batches -= 1
+                    self.cancelled += 1
+                    for item in future.chunk:
+                        if self._inflight.get(item[0]) is future:
+                            del self._inflight[item[0]]
+
+    def _run_batch(self, chunk):
+        try:
+            answered = self.batch_fn(chunk) or {}
+        except Exception as e:
+            print("Advice batch exception:", e)
+            answered = {}
+        for key, tip in answered.items():
+            if tip:
+                self.cache.put(key, tip)
+        with self._lock:
+            self._batches -= 1
+            for item in chunk:
+                self._inflight.pop(item[0], None)
+        return answered
+
+    def stats(self):
+        return {
+            'entries': len(self.cache),
+            'hits': self.cache.hits,
+            'misses': self.cache.misses,
+            'inflight': len(self._inflight),
+            'pending_batches': self._batches,
+            'dropped': self.dropped,
+            'cancelled': self.cancelled,
+        }
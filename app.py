@@ -1,11 +1,23 @@
 import os
-import sqlite3
+import json
 import random
-from datetime import datetime
+import sqlite3
+import threading
+import time
 import requests
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+import numpy as np
+from flask import Flask, Response, g, render_template, request, redirect, url_for, jsonify
 from dotenv import load_dotenv
 from openai import OpenAI
+from weather_cache import WeatherCache, city_key, coord_key, key_location, location_for, location_key, valid_coords
+from advice_engine import AdviceEngine
+from physics import STATUSES
+from db import get_db_connection, init_db, fetch_plants, plant_changes, last_plant_change, prune_plant_changes
+import bulk
+from scheduler import WateringScheduler
+from weather_history import WeatherHistory, calculate_status_integrated, hourly
+from city_refresher import CityRefresher
+from metrics import REGISTRY, HTTP_LATENCY, DEPENDENCY_LATENCY, DEPENDENCY_ERRORS, CACHE_STATS
 
 load_dotenv()
 
@@ -13,40 +25,207 @@ app = Flask(__name__)
 
 OPENWEATHER_KEY = os.getenv('OPENWEATHER_API_KEY')
 OPENAI_KEY = os.getenv('OPENAI_API_KEY')
+OPENWEATHER_URL = os.getenv('OPENWEATHER_URL', 'http://api.openweathermap.org/data/2.5/weather')
+OPENWEATHER_FORECAST_URL = os.getenv('OPENWEATHER_FORECAST_URL', 'http://api.openweathermap.org/data/2.5/forecast')
+# La API de historia es de pago: vacío = desactivada
+OPENWEATHER_HISTORY_URL = os.getenv('OPENWEATHER_HISTORY_URL', '')
+FORECAST_REFRESH = float(os.getenv('FORECAST_REFRESH', 3 * 3600))
+WEATHER_HISTORY_DAYS = int(os.getenv('WEATHER_HISTORY_DAYS', 14))
+WEATHER_CACHE_TTL = float(os.getenv('WEATHER_CACHE_TTL', 600))
+WEATHER_CACHE_STALE_TTL = float(os.getenv('WEATHER_CACHE_STALE_TTL', 1800))
+WEATHER_CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', 256))
+ADVICE_BATCH_SIZE = int(os.getenv('ADVICE_BATCH_SIZE', 20))
+ADVICE_WORKERS = int(os.getenv('ADVICE_WORKERS', 4))
+ADVICE_DEADLINE = float(os.getenv('ADVICE_DEADLINE', 2.5))
+ADVICE_CACHE_TTL = float(os.getenv('ADVICE_CACHE_TTL', 3600))
+ADVICE_CACHE_SIZE = int(os.getenv('ADVICE_CACHE_SIZE', 2048))
+ADVICE_MAX_PENDING = int(os.getenv('ADVICE_MAX_PENDING', 4 * ADVICE_WORKERS))
+PROGRESSIVE_RENDER = os.getenv('PROGRESSIVE_RENDER', '1') != '0'
+PLANTS_PAGE_SIZE = int(os.getenv('PLANTS_PAGE_SIZE', 500))
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 1000))
+CITY_REFRESH_INTERVAL = float(os.getenv('CITY_REFRESH_INTERVAL', 300))
+CITY_REFRESH_WORKERS = int(os.getenv('CITY_REFRESH_WORKERS', 4))
+PLANT_CHANGES_KEEP = float(os.getenv('PLANT_CHANGES_KEEP', 86400))
+DEFAULT_CITY = 'Managua'
+DEFAULT_LOCATION = location_for(DEFAULT_CITY)
+DEFAULT_TEMP = 35
 client = OpenAI(api_key=OPENAI_KEY)
 
-def get_db_connection():
-    conn = sqlite3.connect('lifeplants.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+init_db()
+
+http = requests.Session()
 
-def init_db():
-    conn = get_db_connection()
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS plants (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            species TEXT NOT NULL,
-            plant_type TEXT,
-            last_watered TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            status TEXT DEFAULT 'happy'
+def fetch_weather(key):
+    if key[0] == 'coord':
+        params = {'lat': key[1], 'lon': key[2]}
+    else:
+        params = {'q': key[1]}
+    params.update({'appid': OPENWEATHER_KEY, 'units': 'metric', 'lang': 'en'})
+    try:
+        with DEPENDENCY_LATENCY.time(dependency='openweather', operation='weather'):
+            response = http.get(OPENWEATHER_URL, params=params, timeout=3)
+        if response.status_code != 200:
+            DEPENDENCY_ERRORS.inc(dependency='openweather', operation='weather')
+            return None
+        return response.json()
+    except Exception as e:
+        DEPENDENCY_ERRORS.inc(dependency='openweather', operation='weather')
+        print("OpenWeather exception:", e)
+        return None
+
+# Planificador de riego: se carga de la BD una vez por proceso y antes de cada consulta se pone
+# al día con plant_changes, así ve también lo que escribieron otros workers
+scheduler = WateringScheduler(default_temp=DEFAULT_TEMP)
+scheduler_lock = threading.Lock()
+scheduler_loaded = False
+scheduler_seq = 0
+changes_pruned_at = 0.0
+# Ubicaciones con lectura o pronóstico nuevo desde la última consulta, y su última temperatura
+series_dirty = set()
+location_temps = {}
+series_lock = threading.Lock()
+
+def plant_city(row):
+    return row['city'] or DEFAULT_LOCATION
+
+def load_scheduler(conn):
+    global scheduler_loaded, scheduler_seq
+    scheduler.clear()
+    # Lo que cambie durante la carga tiene seq mayor y se vuelve a aplicar al ponerse al día
+    scheduler_seq = last_plant_change(conn)
+    for rows in bulk.chunked(bulk.iter_plants(conn, chunk_size=BULK_CHUNK_SIZE), BULK_CHUNK_SIZE):
+        scheduler.upsert_many((row['id'], row['last_watered'], plant_city(row)) for row in rows)
+    scheduler_loaded = True
+
+def sync_scheduler(conn):
+    global scheduler_seq
+    while True:
+        changes = plant_changes(conn, scheduler_seq, BULK_CHUNK_SIZE)
+        if not changes:
+            return
+        if changes[0]['seq'] > scheduler_seq + 1:
+            # Los cambios que faltan ya se podaron: recarga completa
+            load_scheduler(conn)
+            continue
+        # Cada fila trae el estado actual de la planta, así que basta con la última por id
+        current = {change['plant_id']: change for change in changes}
+        scheduler.remove([i for i, change in current.items() if change['id'] is None])
+        scheduler.upsert_many(
+            (i, change['last_watered'], plant_city(change)) for i, change in current.items() if change['id'] is not None
         )
-    ''')
-    conn.commit()
-    conn.close()
+        scheduler_seq = changes[-1]['seq']
 
-init_db()
+def mark_series_dirty(location, temp=None):
+    with series_lock:
+        if temp is not None:
+            location_temps[location] = temp
+        series_dirty.add(location)
 
-def get_weather(city_name):
-    if not OPENWEATHER_KEY:
-        return None
+def get_scheduler():
+    global changes_pruned_at
+    conn = get_db_connection()
+    with scheduler_lock:
+        if not scheduler_loaded:
+            load_scheduler(conn)
+        sync_scheduler(conn)
+        now = time.time()
+        if now - changes_pruned_at > 3600:
+            prune_plant_changes(conn, now - PLANT_CHANGES_KEEP)
+            changes_pruned_at = now
+        # Solo se re-calculan las ubicaciones con datos nuevos (y las que aún no tienen serie): /due nunca
+        # llama a OpenWeather. Es la misma serie horaria que usa el dashboard, con la última lectura como fallback
+        with series_lock:
+            pending = {location: location_temps.get(location, DEFAULT_TEMP)
+                       for location in series_dirty.union(scheduler.cities_without_series())}
+            series_dirty.clear()
+        scheduler.set_series({location: weather_history.series(location, temp) for location, temp in pending.items()})
+    return scheduler
+
+weather_history = WeatherHistory(get_db_connection, keep_days=WEATHER_HISTORY_DAYS)
+forecast_fetched = {}
+forecast_lock = threading.Lock()
+
+def fetch_series(url, location, **params):
+    operation = 'history' if url == OPENWEATHER_HISTORY_URL else 'forecast'
+    key = location_key(location)
+    if key[0] == 'coord':
+        params.update({'lat': key[1], 'lon': key[2]})
+    else:
+        params['q'] = key[1]
+    params.update({'appid': OPENWEATHER_KEY, 'units': 'metric'})
     try:
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={OPENWEATHER_KEY}&units=metric&lang=en"
-        response = requests.get(url, timeout=3)
-        return response.json() if response.status_code == 200 else None
+        with DEPENDENCY_LATENCY.time(dependency='openweather', operation=operation):
+            response = http.get(url, params=params, timeout=10)
+        if response.status_code != 200:
+            DEPENDENCY_ERRORS.inc(dependency='openweather', operation=operation)
+            print("OpenWeather series error:", url, response.status_code)
+            return {}
+        return hourly((item['dt'], item['main']['temp']) for item in response.json().get('list', []))
     except Exception as e:
+        DEPENDENCY_ERRORS.inc(dependency='openweather', operation=operation)
         print("OpenWeather exception:", e)
+        return {}
+
+def ingest_forecast(city, backfill):
+    now = time.time()
+    try:
+        weather_history.record(city, fetch_series(OPENWEATHER_FORECAST_URL, city), 'forecast')
+        if backfill and OPENWEATHER_HISTORY_URL:
+            start = int(now) - WEATHER_HISTORY_DAYS * 86400
+            weather_history.record(city, fetch_series(OPENWEATHER_HISTORY_URL, city, type='hour', start=start, end=int(now)), 'history')
+        weather_history.prune(now)
+    except sqlite3.Error as e:
+        print("Weather history exception:", e)
+    mark_series_dirty(city)
+
+def refresh_forecast(city):
+    now = time.time()
+    with forecast_lock:
+        last = forecast_fetched.get(city)
+        if last is not None and now - last < FORECAST_REFRESH:
+            return
+        forecast_fetched[city] = now
+    threading.Thread(target=ingest_forecast, args=(city, last is None), daemon=True).start()
+
+def location_has_plants(location):
+    if location == DEFAULT_LOCATION:
+        return True
+    return get_db_connection().execute('SELECT 1 FROM plants WHERE city = ? LIMIT 1', (location,)).fetchone() is not None
+
+def on_weather_update(key, weather_data):
+    location = key_location(key)
+    # Solo se guarda historia (y se pide pronóstico) donde hay plantas: un ?lat=&lon= cualquiera no llena la BD
+    if not location_has_plants(location):
+        return
+    temp = weather_data['main']['temp']
+    try:
+        weather_history.observe(location, weather_data.get('dt') or time.time(), temp)
+    except sqlite3.Error as e:
+        print("Weather history exception:", e)
+    mark_series_dirty(location, temp)
+    refresh_forecast(location)
+
+weather_cache = WeatherCache(
+    fetch_weather,
+    ttl=WEATHER_CACHE_TTL,
+    stale_ttl=WEATHER_CACHE_STALE_TTL,
+    max_entries=WEATHER_CACHE_SIZE,
+    on_update=on_weather_update,
+)
+
+def get_weather(city_name=None, lat=None, lon=None, block=True):
+    if not OPENWEATHER_KEY:
         return None
+    key = coord_key(lat, lon) if lat is not None and lon is not None else city_key(city_name)
+    # Incluye aciertos del caché: mide lo que realmente espera la petición
+    with DEPENDENCY_LATENCY.time(dependency='weather_cache', operation='get'):
+        return weather_cache.get(key, block=block)
+
+def get_location_weather(location, block=True):
+    if not OPENWEATHER_KEY:
+        return None
+    with DEPENDENCY_LATENCY.time(dependency='weather_cache', operation='get'):
+        return weather_cache.get(location_key(location), block=block)
 
 # Fallback local de consejos
 def local_advice(species, temp, humidity, city):
@@ -80,104 +259,407 @@ def ai_advice(prompt_text):
     if not OPENAI_KEY:
         return None
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a concise plant care coach."},
-                {"role": "user", "content": prompt_text}
-            ],
-            max_tokens=120,
-            temperature=0.6,
-        )
+        with DEPENDENCY_LATENCY.time(dependency='openai', operation='advice'):
+            resp = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You are a concise plant care coach."},
+                    {"role": "user", "content": prompt_text}
+                ],
+                max_tokens=120,
+                temperature=0.6,
+            )
         return resp.choices[0].message.content.strip()
     except Exception as e:
+        DEPENDENCY_ERRORS.inc(dependency='openai', operation='advice')
         print("OpenAI exception:", e)
         return None
 
-def get_advice(species, temp, humidity, city):
+def ai_batch_advice(items):
+    if not OPENAI_KEY:
+        return {}
+    plants = [
+        {"id": str(i), "plant": species, "city": city, "temp_c": temp, "humidity_pct": humidity}
+        for i, (key, species, temp, humidity, city) in enumerate(items)
+    ]
     prompt = (
-        f"Plant: {species}. City: {city}. Temp: {temp}°C. Humidity: {humidity}%. "
-        "Give ONE actionable, specific tip (max 35 words). "
+        "For EACH plant below give ONE actionable, specific tip (max 35 words). "
         "If heat risk, mention shade/evaporation. If cold risk, mention insulation. "
-        "Tone: friendly, direct. No disclaimers."
+        "Tone: friendly, direct. No disclaimers. "
+        'Reply with a JSON object {"tips": {"<id>": "<tip>", ...}} covering every id.\n'
+        f"Plants: {json.dumps(plants, ensure_ascii=False)}"
     )
-    ai_resp = ai_advice(prompt)
-    if ai_resp:
-        return ai_resp
-    return local_advice(species, temp, humidity, city)
-
-def calculate_status_physics(last_watered_str, current_temp):
     try:
-        last_watered = datetime.fromisoformat(last_watered_str)
-    except Exception:
-        last_watered = datetime.now()
-    hours_passed = (datetime.now() - last_watered).total_seconds() / 3600
-    base_decay_rate = 5
-    multiplier = 2.5 if current_temp > 30 else 1.0
-    moisture_loss = hours_passed * base_decay_rate * multiplier
-    current_humidity = max(0, 100 - moisture_loss)
-    if current_humidity < 30:
-        status = 'critical'
-    elif current_humidity < 60:
-        status = 'thirsty'
-    else:
-        status = 'happy'
-    return int(current_humidity), status
+        with DEPENDENCY_LATENCY.time(dependency='openai', operation='batch_advice'):
+            resp = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You are a concise plant care coach."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=60 * len(items) + 40,
+                temperature=0.6,
+                response_format={"type": "json_object"},
+            )
+        tips = json.loads(resp.choices[0].message.content).get("tips") or {}
+    except Exception as e:
+        DEPENDENCY_ERRORS.inc(dependency='openai', operation='batch_advice')
+        print("OpenAI exception:", e)
+        return {}
+    answered = {}
+    for i, item in enumerate(items):
+        tip = tips.get(str(i))
+        if isinstance(tip, str) and tip.strip():
+            answered[item[0]] = tip.strip()
+    return answered
 
-@app.route('/')
-def index():
-    city = request.args.get('city', 'Managua')
-    weather_data = get_weather(city)
-    current_temp = weather_data['main']['temp'] if weather_data else 35
-    conn = get_db_connection()
-    db_plants = conn.execute('SELECT * FROM plants').fetchall()
-    conn.close()
-    processed_plants = []
-    for plant in db_plants:
-        humidity, status = calculate_status_physics(plant['last_watered'], current_temp)
-        advice = get_advice(plant['species'], current_temp, humidity, city)
+advice_engine = AdviceEngine(
+    ai_batch_advice,
+    local_advice,
+    batch_size=ADVICE_BATCH_SIZE,
+    max_workers=ADVICE_WORKERS,
+    deadline=ADVICE_DEADLINE,
+    ttl=ADVICE_CACHE_TTL,
+    max_entries=ADVICE_CACHE_SIZE,
+    max_pending=ADVICE_MAX_PENDING,
+)
+
+def get_advice(species, temp, humidity, city):
+    return advice_engine.advise([(species, temp, humidity, city)])[0]
+
+def plant_rows(db_plants, current_temp, location=DEFAULT_LOCATION, block=False):
+    # Pérdida de humedad integrada hora a hora con la serie de la ubicación de cada planta (la misma
+    # que usa el refresher); la ubicación de la página usa current_temp, las demás su clima en caché
+    by_location = {}
+    for i, plant in enumerate(db_plants):
+        by_location.setdefault(plant_city(plant), []).append(i)
+    humidities = np.zeros(len(db_plants), dtype=np.int64)
+    codes = np.zeros(len(db_plants), dtype=np.int8)
+    temps = [current_temp] * len(db_plants)
+    for plant_location, indexes in by_location.items():
+        temp = current_temp
+        if plant_location != location:
+            weather_data = get_location_weather(plant_location, block=block)
+            temp = weather_data['main']['temp'] if weather_data else DEFAULT_TEMP
+        series = weather_history.series(plant_location, temp)
+        humidities[indexes], codes[indexes] = calculate_status_integrated([db_plants[i]['last_watered'] for i in indexes], series)
+        for i in indexes:
+            temps[i] = temp
+    rows = []
+    for plant, humidity, status, temp in zip(db_plants, humidities.tolist(), STATUSES[codes].tolist(), temps):
         plant_type_val = plant['plant_type'] if 'plant_type' in plant.keys() else 'Unknown'
-        processed_plants.append({
+        rows.append({
             'id': plant['id'],
             'name': plant['name'],
             'species': plant['species'],
             'plant_type': plant_type_val,
             'humidity': humidity,
             'status': status,
-            'advice': advice
+            'location': plant_city(plant),
+            'temp': temp,
+            'advice': None
+        })
+    return rows
+
+def page_place(args, strict=False):
+    """(garden_id, city, lat, lon) for a page: an explicit ?city= or ?lat=&lon= wins, else the garden's location.
+
+    Coordinates off the globe (or nan) raise ValueError with strict=True and are ignored otherwise.
+    """
+    garden_id = args.get('garden', 1, type=int)
+    city, lat, lon = args.get('city'), args.get('lat'), args.get('lon')
+    if lat not in (None, '') and lon not in (None, ''):
+        try:
+            lat, lon = valid_coords(lat, lon)
+        except ValueError:
+            if strict:
+                raise
+            lat = lon = None
+    else:
+        lat = lon = None
+    if not city and (lat is None or lon is None):
+        garden = get_db_connection().execute('SELECT name, location, lat, lon FROM gardens WHERE id = ?', (garden_id,)).fetchone()
+        if garden is not None:
+            city, lat, lon = garden['location'], garden['lat'], garden['lon']
+            if lat is not None and lon is not None:
+                city = garden['name']
+    return garden_id, city or DEFAULT_CITY, lat, lon
+
+@app.template_global()
+def location_args(location, name=None):
+    """url_for arguments for a page showing `location` itself: its lat/lon (named `name`), or its city."""
+    key = location_key(location)
+    if key[0] == 'coord':
+        return {'city': name, 'lat': key[1], 'lon': key[2]}
+    return {'city': key[1]}
+
+def advice_requests(rows, location, city):
+    # Cada planta con la temperatura de su ubicación; la de la página se nombra como la página
+    return [(row['species'], row['temp'], row['humidity'], city if row['location'] == location else row['location']) for row in rows]
+
+# Un solo fetch de clima y un solo recálculo por ciudad distinta, para todos los usuarios
+def plant_locations():
+    conn = get_db_connection()
+    locations = {row[0] for row in conn.execute('SELECT DISTINCT city FROM plants')}
+    if None in locations:
+        locations.discard(None)
+        locations.add(DEFAULT_LOCATION)
+    forget_unplanted(locations | {DEFAULT_LOCATION})
+    return sorted(locations)
+
+def forget_unplanted(keep):
+    # El estado en memoria por ubicación se dimensiona con las ubicaciones plantadas, no con un tamaño fijo
+    weather_history.retain(keep)
+    for lock, entries in ((forecast_lock, forecast_fetched), (series_lock, location_temps)):
+        with lock:
+            for location in [loc for loc in entries if loc not in keep]:
+                del entries[location]
+
+def refresh_location(location):
+    weather_data = get_location_weather(location)
+    current_temp = weather_data['main']['temp'] if weather_data else DEFAULT_TEMP
+    series = weather_history.series(location, current_temp)
+    conn = get_db_connection()
+    if location == DEFAULT_LOCATION:
+        rows = conn.execute('SELECT id, last_watered, status FROM plants WHERE city = ? OR city IS NULL', (location,)).fetchall()
+    else:
+        rows = conn.execute('SELECT id, last_watered, status FROM plants WHERE city = ?', (location,)).fetchall()
+    humidities, codes = calculate_status_integrated([r['last_watered'] for r in rows], series)
+    statuses = STATUSES[codes].tolist()
+    changed = [(status, row['id']) for row, status in zip(rows, statuses) if row['status'] != status]
+    if changed:
+        with conn:
+            conn.executemany('UPDATE plants SET status = ? WHERE id = ?', changed)
+    counts = {name: int(n) for name, n in zip(STATUSES.tolist(), np.bincount(codes, minlength=len(STATUSES)))}
+    return {
+        'location': location,
+        'name': weather_data['name'] if weather_data else location,
+        'temp': current_temp,
+        'weather': weather_data['weather'][0]['main'] if weather_data else 'Offline',
+        'plants': len(rows),
+        'counts': counts,
+        'avg_humidity': float(humidities.mean()) if len(rows) else None,
+        'updated_at': time.time(),
+    }
+
+city_refresher = CityRefresher(plant_locations, refresh_location, interval=CITY_REFRESH_INTERVAL, max_workers=CITY_REFRESH_WORKERS)
+
+@app.before_request
+def start_city_refresher():
+    if CITY_REFRESH_INTERVAL > 0:
+        city_refresher.start()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    # Las respuestas en streaming (SSE, export) se miden hasta la cabecera, no hasta el final del cuerpo
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - started, route=route, method=request.method, status=response.status_code)
+    return response
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/')
+def index():
+    garden_id, city, lat, lon = page_place(request.args)
+    after_id = request.args.get('after', 0, type=int)
+    # Modo progresivo: no esperamos a OpenWeather ni a OpenAI, el consejo llega por /advice/stream
+    progressive = PROGRESSIVE_RENDER and request.args.get('progressive') != '0'
+    weather_data = get_weather(city, lat, lon, block=not progressive)
+    current_temp = weather_data['main']['temp'] if weather_data else 35
+    db_plants = fetch_plants(get_db_connection(), garden_id=garden_id, after_id=after_id, limit=PLANTS_PAGE_SIZE)
+    location = location_for(city, lat, lon)
+    processed_plants = plant_rows(db_plants, current_temp, location, block=not progressive)
+    if not progressive:
+        advices = advice_engine.advise(advice_requests(processed_plants, location, city))
+        for plant, advice in zip(processed_plants, advices):
+            plant['advice'] = advice
+    next_after = processed_plants[-1]['id'] if len(processed_plants) == PLANTS_PAGE_SIZE else None
+    overview = city_refresher.overview()['locations']
+    return render_template('index.html', plants=processed_plants, weather=weather_data, temp=current_temp, current_city=city,
+                           progressive=progressive, lat=lat, lon=lon, garden_id=garden_id, after_id=after_id, next_after=next_after,
+                           overview=overview)
+
+@app.route('/advice/stream')
+def advice_stream():
+    garden_id, city, lat, lon = page_place(request.args)
+    after_id = request.args.get('after', 0, type=int)
+    weather_data = get_weather(city, lat, lon)
+    current_temp = weather_data['main']['temp'] if weather_data else 35
+    db_plants = fetch_plants(get_db_connection(), garden_id=garden_id, after_id=after_id, limit=PLANTS_PAGE_SIZE)
+    location = location_for(city, lat, lon)
+    rows = plant_rows(db_plants, current_temp, location, block=True)
+
+    def events():
+        yield sse('weather', {
+            'temp': current_temp,
+            'name': weather_data['name'] if weather_data else city,
+            'main': weather_data['weather'][0]['main'] if weather_data else 'Offline',
         })
-    return render_template('index.html', plants=processed_plants, weather=weather_data, temp=current_temp, current_city=city)
+        for i, advice in advice_engine.iter_advice(advice_requests(rows, location, city)):
+            yield sse('plant', dict(rows[i], advice=advice))
+        yield sse('done', {'count': len(rows)})
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/add', methods=('POST',))
 def add_plant():
     name = request.form['name']
     species = request.form['species']
     plant_type = request.form['type']
+    try:
+        garden_id, city, lat, lon = page_place(request.form, strict=True)
+    except ValueError:
+        return jsonify({"error": "lat must be a number in [-90, 90] and lon in [-180, 180]"}), 400
+    location = location_for(city, lat, lon)
+    now = int(time.time())
     conn = get_db_connection()
-    conn.execute(
-        'INSERT INTO plants (name, species, plant_type, last_watered) VALUES (?, ?, ?, ?)',
-        (name, species, plant_type, datetime.now().isoformat())
-    )
-    conn.commit()
-    conn.close()
-    return redirect(url_for('index'))
+    if conn.execute('SELECT 1 FROM gardens WHERE id = ?', (garden_id,)).fetchone() is None:
+        return jsonify({"error": "unknown garden"}), 400
+    with conn:
+        conn.execute(
+            'INSERT INTO plants (name, species, plant_type, last_watered, garden_id, city) VALUES (?, ?, ?, ?, ?, ?)',
+            (name, species, plant_type, now, garden_id, location)
+        )
+    return redirect(url_for('index', garden=garden_id, city=city, lat=lat, lon=lon))
 
 @app.route('/water/<int:id>')
 def water_plant(id):
+    now = int(time.time())
     conn = get_db_connection()
-    conn.execute('UPDATE plants SET last_watered = ? WHERE id = ?', (datetime.now().isoformat(), id))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute('UPDATE plants SET last_watered = ? WHERE id = ?', (now, id))
     return redirect(url_for('index'))
 
 @app.route('/delete/<int:id>')
 def delete_plant(id):
     conn = get_db_connection()
-    conn.execute('DELETE FROM plants WHERE id = ?', (id,))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute('DELETE FROM plants WHERE id = ?', (id,))
     return redirect(url_for('index'))
 
+@app.route('/plants/import', methods=['POST'])
+def import_plants():
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    filename = (upload.filename if upload else '') or ''
+    fmt = request.args.get('format')
+    if not fmt:
+        content_type = (upload.mimetype if upload else request.mimetype) or ''
+        is_ndjson = 'ndjson' in content_type or 'jsonl' in content_type or filename.endswith(('.ndjson', '.jsonl'))
+        fmt = 'ndjson' if is_ndjson else 'csv'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    records = bulk.iter_ndjson(stream) if fmt == 'ndjson' else bulk.iter_csv(stream)
+    summary = bulk.import_plants(get_db_connection(), records, chunk_size=BULK_CHUNK_SIZE, default_location=DEFAULT_LOCATION)
+    if 'error' in summary:
+        return jsonify(summary), 400
+    return jsonify(summary)
+
+def bulk_ids():
+    data = request.get_json(silent=True) or {}
+    return bulk.parse_ids(data.get('ids'))
+
+@app.route('/plants/water', methods=['POST'])
+def water_plants():
+    try:
+        ids = bulk_ids()
+    except (ValueError, TypeError):
+        return jsonify({"error": "send a JSON body like {\"ids\": [1, 2, 3]}"}), 400
+    now = int(time.time())
+    watered = bulk.water_plants(get_db_connection(), ids, chunk_size=BULK_CHUNK_SIZE, now=now)
+    return jsonify({"requested": len(ids), "watered": watered})
+
+@app.route('/plants/delete', methods=['POST'])
+def delete_plants():
+    try:
+        ids = bulk_ids()
+    except (ValueError, TypeError):
+        return jsonify({"error": "send a JSON body like {\"ids\": [1, 2, 3]}"}), 400
+    deleted = bulk.delete_plants(get_db_connection(), ids, chunk_size=BULK_CHUNK_SIZE)
+    return jsonify({"requested": len(ids), "deleted": deleted})
+
+@app.route('/plants/export')
+def export_plants():
+    fmt = request.args.get('format', 'csv')
+    rows = bulk.iter_plants(get_db_connection(), chunk_size=BULK_CHUNK_SIZE)
+    if fmt == 'ndjson':
+        return Response(bulk.export_ndjson(rows), mimetype='application/x-ndjson',
+                        headers={'Content-Disposition': 'attachment; filename=plants.ndjson'})
+    if fmt == 'csv':
+        return Response(bulk.export_csv(rows), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=plants.csv'})
+    return jsonify({"error": "format must be csv or ndjson"}), 400
+
+@app.route('/due')
+def due_plants():
+    n = max(1, min(request.args.get('n', 10, type=int), 500))
+    within = request.args.get('within', type=float)
+    now = time.time()
+    due = get_scheduler().due(n, until=now + within * 3600 if within is not None else None)
+    names = {}
+    if due:
+        ids = [plant['id'] for plant in due]
+        placeholders = ','.join('?' * len(ids))
+        for row in get_db_connection().execute(f'SELECT id, name, species FROM plants WHERE id IN ({placeholders})', ids):
+            names[row['id']] = (row['name'], row['species'])
+    for plant in due:
+        plant['name'], plant['species'] = names.get(plant['id'], (None, None))
+        plant['overdue'] = plant['thirsty_at'] < now
+    return jsonify({"now": now, "plants": due})
+
+@app.route('/gardens', methods=['POST'])
+def create_garden():
+    data = request.get_json(silent=True) or {}
+    name, city = data.get('name'), data.get('city')
+    lat, lon = data.get('lat'), data.get('lon')
+    has_coords = lat not in (None, '') and lon not in (None, '')
+    if not isinstance(name, str) or not name.strip() or not (has_coords or (isinstance(city, str) and city.strip())):
+        return jsonify({"error": "name and either city or lat/lon are required"}), 400
+    name = name.strip()
+    if has_coords:
+        try:
+            lat, lon = valid_coords(lat, lon)
+        except (ValueError, TypeError):
+            return jsonify({"error": "lat must be a number in [-90, 90] and lon in [-180, 180]"}), 400
+    else:
+        lat = lon = None
+    location = location_for(city if isinstance(city, str) else None, lat, lon)
+    conn = get_db_connection()
+    with conn:
+        cursor = conn.execute('INSERT INTO gardens (name, location, lat, lon) VALUES (?, ?, ?, ?)', (name, location, lat, lon))
+    return jsonify({"id": cursor.lastrowid, "name": name, "location": location}), 201
+
+@app.route('/overview')
+def overview():
+    # Solo lee resultados precalculados: nunca llama a OpenWeather desde aquí
+    if CITY_REFRESH_INTERVAL > 0:
+        city_refresher.start()
+    return jsonify(city_refresher.overview())
+
+@app.route('/weather/stats')
+def weather_stats():
+    return jsonify(weather_cache.stats())
+
+@app.route('/advice/stats')
+def advice_stats():
+    return jsonify(advice_engine.stats())
+
+@app.route('/metrics')
+def metrics():
+    for cache, stats in (('weather', weather_cache.stats()), ('advice', advice_engine.stats())):
+        for stat, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                CACHE_STATS.set(value, cache=cache, stat=stat)
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/chatbot', methods=['POST'])
 def chatbot():
     data = request.get_json() or {}
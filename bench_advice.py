@@ -0,0 +1,64 @@
+import argparse
+import os
+import tempfile
+import time
+
+from fake_upstreams import FakeUpstream
+
+# Latencia de index() según el tamaño del jardín, contra un OpenAI falso local.
+# Uso: python bench_advice.py --sizes 1 10 40 100 --ai-latency 0.3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 40, 100])
+    parser.add_argument('--ai-latency', type=float, default=0.3)
+    parser.add_argument('--serial', action='store_true', help='also time one ai_advice call per plant (old behaviour)')
+    args = parser.parse_args()
+
+    fake = FakeUpstream(latency=0.0, ai_latency=args.ai_latency).start()
+    os.environ['OPENWEATHER_URL'] = f"{fake.url}/data/2.5/weather"
+    os.environ['OPENWEATHER_FORECAST_URL'] = f"{fake.url}/data/2.5/forecast"
+    os.environ['OPENAI_BASE_URL'] = f"{fake.url}/v1"
+    os.environ['OPENWEATHER_API_KEY'] = 'bench'
+    os.environ['OPENAI_API_KEY'] = 'bench'
+    os.environ['CITY_REFRESH_INTERVAL'] = '0'
+    os.chdir(tempfile.mkdtemp(prefix='lifeplants-bench-'))
+    import app
+
+    client = app.app.test_client()
+    print(f"{'plants':>7} {'cold ms':>9} {'warm ms':>9} {'ai calls':>9}" + (f" {'serial ms':>10}" if args.serial else ''))
+    for size in args.sizes:
+        conn = app.get_db_connection()
+        with conn:
+            conn.execute('DELETE FROM plants')
+            conn.executemany(
+                'INSERT INTO plants (name, species, plant_type, last_watered) VALUES (?, ?, ?, ?)',
+                [(f"Plant {i}", f"Species {i}", 'Shrub', int(time.time())) for i in range(size)]
+            )
+        app.advice_engine.cache.clear()
+        client.get('/?city=Managua&progressive=0')  # calienta el caché de clima
+        app.advice_engine.cache.clear()
+
+        before = fake.calls.get('chat', 0)
+        started = time.perf_counter()
+        client.get('/?city=Managua&progressive=0')
+        cold = time.perf_counter() - started
+        calls = fake.calls.get('chat', 0) - before
+
+        started = time.perf_counter()
+        client.get('/?city=Managua&progressive=0')
+        warm = time.perf_counter() - started
+
+        row = f"{size:>7} {cold * 1000:>9.1f} {warm * 1000:>9.1f} {calls:>9}"
+        if args.serial:
+            started = time.perf_counter()
+            for i in range(size):
+                app.ai_advice(f"Plant: Species {i}. City: Managua. Give ONE tip.")
+            row += f" {(time.perf_counter() - started) * 1000:>10.1f}"
+        print(row)
+    fake.stop()
+
+
+if __name__ == '__main__':
+    main()
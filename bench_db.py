@@ -0,0 +1,92 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Carga concurrente sobre /, /water/<id> y /add con la capa SQLite nueva
+# (conexión por hilo, WAL, índices) contra el esquema anterior (conexión nueva
+# por petición, journal por defecto, sin índices).
+# Uso: python bench_db.py --threads 8 --requests 2000 --plants 2000
+
+os.environ.setdefault('OPENAI_API_KEY', 'bench')
+os.environ.pop('OPENWEATHER_API_KEY', None)
+os.environ['PROGRESSIVE_RENDER'] = '1'
+os.environ['CITY_REFRESH_INTERVAL'] = '0'
+os.environ['LIFEPLANTS_DB'] = os.path.join(tempfile.mkdtemp(prefix='lifeplants-bench-'), 'startup.db')
+
+import app
+import db
+
+
+def legacy_connection(path):
+    def get_db_connection():
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return get_db_connection
+
+
+def prepare(mode, plants):
+    path = os.path.join(tempfile.mkdtemp(prefix=f'lifeplants-{mode}-'), 'lifeplants.db')
+    conn = db.connect(path)
+    db.init_db(conn)
+    with conn:
+        conn.executemany(
+            'INSERT INTO plants (name, species, plant_type, last_watered) VALUES (?, ?, ?, ?)',
+            ((f"Plant {i}", f"Species {i % 50}", 'Shrub', int(time.time()) - i * 60) for i in range(plants))
+        )
+    if mode == 'legacy':
+        conn.execute('DROP INDEX idx_plants_garden')
+        conn.execute('DROP INDEX idx_plants_city')
+        conn.execute('PRAGMA journal_mode = DELETE')
+        conn.close()
+        app.get_db_connection = legacy_connection(path)
+    else:
+        conn.close()
+        db.DB_PATH = path
+        app.get_db_connection = db.get_db_connection
+
+
+def run(route, threads, requests, plants):
+    errors = 0
+
+    def one(i):
+        client = app.app.test_client()
+        if route == '/':
+            r = client.get('/')
+        elif route == '/water':
+            r = client.get(f'/water/{i % plants + 1}')
+        else:
+            r = client.post('/add', data={'name': f'Bench {i}', 'species': 'Fern', 'type': 'Vine'})
+        return r.status_code < 400
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for ok in pool.map(one, range(requests)):
+            errors += not ok
+    return requests / (time.perf_counter() - started), errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--plants', type=int, default=2000)
+    args = parser.parse_args()
+
+    app.app.config['PROPAGATE_EXCEPTIONS'] = False
+    print(f"{'route':<8} {'legacy req/s':>13} {'pooled req/s':>13} {'speedup':>8}  errors")
+    results = {}
+    for mode in ('legacy', 'pooled'):
+        prepare(mode, args.plants)
+        for route in ('/', '/water', '/add'):
+            results[mode, route] = run(route, args.threads, args.requests, args.plants)
+    for route in ('/', '/water', '/add'):
+        (old, old_err), (new, new_err) = results['legacy', route], results['pooled', route]
+        print(f"{route:<8} {old:>13.0f} {new:>13.0f} {new / old:>7.1f}x  {old_err}/{new_err}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from physics import HEAT_MULTIPLIER, HEAT_THRESHOLD, STATUSES, calculate_status_batch
+from weather_history import HOUR, TemperatureSeries, calculate_status_integrated, hourly, threshold_crossings_integrated
+
+# Comprueba el modelo integrado hora a hora contra datos fijos y mide su costo.
+# Uso: python bench_history.py --plants 100000
+# Sale con código 1 si falla alguna comprobación.
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'forecast_managua.json')
+
+
+def load_fixture(path=FIXTURE):
+    with open(path) as f:
+        data = json.load(f)
+    return hourly((item['dt'], item['main']['temp']) for item in data['list'])
+
+
+def brute_force_seconds(temps_by_hour, last_watered, now, fallback_temp):
+    # Minuto a minuto con la temperatura de la hora correspondiente (suma exacta: múltiplos de 30 s)
+    total = 0.0
+    for minute in range(int(last_watered) // 60, int(now) // 60):
+        temp = temps_by_hour.get(minute * 60 // HOUR, fallback_temp)
+        total += 60 * (HEAT_MULTIPLIER if temp > HEAT_THRESHOLD else 1.0)
+    return total
+
+
+def check(failures, name, ok, detail=''):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}" + (f" ({detail})" if detail else ''))
+    if not ok:
+        failures.append(name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plants', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    failures = []
+
+    temps_by_hour = load_fixture()
+    hours = sorted(temps_by_hour)
+    fallback_temp = 26.0
+    series = TemperatureSeries(hours[0], [temps_by_hour[h] for h in hours], fallback_temp)
+    print(f"fixture: {len(series)} hourly points, {int((series.multipliers > 1).sum())} hot hours")
+
+    # 1. Contra integración numérica minuto a minuto sobre el fixture
+    rng = np.random.default_rng(args.seed)
+    now = series.start + 40 * HOUR + 1800
+    last_watered = now - rng.integers(0, 36 * 60, 200) * 60
+    integrated = series.effective_seconds(now) - series.effective_seconds(last_watered)
+    expected = [brute_force_seconds(temps_by_hour, t, now, fallback_temp) for t in last_watered.tolist()]
+    check(failures, "matches minute-by-minute integration", integrated.tolist() == expected)
+
+    # Caso a mano: regado al inicio del fixture, 12 h después (horas > 30 °C cuentan x2.5)
+    hot = sum(temps_by_hour[h] > HEAT_THRESHOLD for h in hours[:12])
+    humidity, codes = calculate_status_integrated([series.start], series, now=series.start + 12 * HOUR)
+    want = int(max(0, 100 - 5 * (12 - hot + 2.5 * hot)))
+    check(failures, f"12 h after watering ({hot} hot hours)", humidity[0] == want,
+          f"{humidity[0]}% {STATUSES[codes][0]}, expected {want}%")
+
+    # 2. Sin historia (temperatura constante) debe coincidir con el modelo original
+    constant = TemperatureSeries(0, [], 33.0)
+    last_watered = now - rng.integers(0, 30 * 3600, 10000)
+    a = calculate_status_integrated(last_watered, constant, now=now)
+    b = calculate_status_batch(last_watered, 33.0, now=now)
+    check(failures, "constant temperature matches calculate_status_batch",
+          bool((a[0] == b[0]).all() and (a[1] == b[1]).all()))
+
+    # 3. Los cruces de umbral (/due) coinciden con el estado integrado (dashboard) en cualquier instante
+    mismatches = 0
+    for t in series.start + rng.integers(-20 * HOUR, (len(series) + 40) * HOUR, 100):
+        last_watered = t - rng.integers(0, 40 * 3600, 500)
+        _, codes = calculate_status_integrated(last_watered, series, now=t)
+        thirsty_at, critical_at = threshold_crossings_integrated(last_watered, series)
+        mismatches += int(((thirsty_at < t) != (codes < 2)).sum() + ((critical_at < t) != (codes < 1)).sum())
+    check(failures, "threshold crossings agree with integrated status", mismatches == 0, f"{mismatches} mismatches")
+
+    # 4. Costo por planta después del preprocesado
+    last_watered = now - rng.integers(0, 48 * 3600, args.plants)
+    started = time.perf_counter()
+    calculate_status_integrated(last_watered, series, now=now)
+    elapsed = time.perf_counter() - started
+    print(f"{args.plants} plants: {elapsed * 1000:.1f} ms ({elapsed / args.plants * 1e9:.0f} ns/plant)")
+
+    if failures:
+        sys.exit(f"{len(failures)} check(s) failed")
+
+
+if __name__ == '__main__':
+    main()
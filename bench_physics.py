@@ -0,0 +1,56 @@
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from physics import STATUSES, calculate_status_batch, calculate_status_physics
+
+# Física escalar (una planta a la vez) contra la versión vectorizada con NumPy.
+# Uso: python bench_physics.py --sizes 1000 100000 1000000
+# Sale con código 1 si algún tamaño no da resultados idénticos.
+
+
+def make_garden(size, now, rng):
+    # Segundos enteros: la resta es exacta en ambos caminos y los resultados deben ser idénticos
+    last_watered = now - rng.integers(0, 40 * 3600, size)
+    temps = rng.choice([18.0, 25.0, 30.0, 30.5, 36.0], size)
+    return last_watered, temps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    now = int(time.time())
+    now_dt = datetime.fromtimestamp(now)
+    print(f"{'plants':>9} {'scalar s':>10} {'batch s':>10} {'speedup':>9}  identical")
+    failed = False
+    for size in args.sizes:
+        last_watered, temps = make_garden(size, now, rng)
+        iso = [datetime.fromtimestamp(int(t)).isoformat() for t in last_watered]
+
+        started = time.perf_counter()
+        scalar = [calculate_status_physics(s, t, now=now_dt) for s, t in zip(iso, temps.tolist())]
+        scalar_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        humidity, codes = calculate_status_batch(last_watered, temps, now=now)
+        batch_s = time.perf_counter() - started
+
+        identical = (
+            [h for h, _ in scalar] == humidity.tolist()
+            and [s for _, s in scalar] == STATUSES[codes].tolist()
+        )
+        print(f"{size:>9} {scalar_s:>10.4f} {batch_s:>10.4f} {scalar_s / batch_s:>8.0f}x  {identical}")
+        failed = failed or not identical
+    if failed:
+        sys.exit("FAIL: batch results differ from calculate_status_physics")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_upstreams import FakeUpstream
+
+# Benchmark del caché de clima contra un OpenWeather falso local.
+# Uso: python bench_weather.py --threads 32 --requests 2000 --latency 0.1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--cities', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--ttl', type=float, default=600)
+    args = parser.parse_args()
+
+    fake = FakeUpstream(latency=args.latency).start()
+    os.environ['OPENWEATHER_URL'] = f"{fake.url}/data/2.5/weather"
+    os.environ['OPENWEATHER_FORECAST_URL'] = f"{fake.url}/data/2.5/forecast"
+    os.environ['OPENWEATHER_API_KEY'] = 'bench'
+    os.environ.setdefault('OPENAI_API_KEY', 'bench')
+    os.environ['WEATHER_CACHE_TTL'] = str(args.ttl)
+    # Cada lectura falsa se guarda en weather_history: nunca en la BD real
+    os.environ['LIFEPLANTS_DB'] = os.path.join(tempfile.mkdtemp(prefix='lifeplants-bench-'), 'lifeplants.db')
+    import app
+
+    cities = ['Managua', 'Oslo', 'London', 'Lima', 'Tokyo', 'Cairo', 'Quito', 'Madrid'][:args.cities]
+    # variantes de mayúsculas/espacios caen en la misma clave normalizada
+    names = [c if i % 2 else f"  {c.upper()} " for i, c in enumerate(cities * 2)]
+
+    latencies = []
+
+    def one(i):
+        started = time.perf_counter()
+        data = app.get_weather(names[i % len(names)])
+        latencies.append(time.perf_counter() - started)
+        return data is not None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        ok = sum(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    stats = app.weather_cache.stats()
+    print(f"requests:             {args.requests} ({ok} ok) in {elapsed:.3f}s -> {args.requests / elapsed:.0f} req/s")
+    print(f"upstream calls:       {fake.calls.get('weather', 0)} for {len(cities)} distinct cities")
+    print(f"p50 / p99:            {latencies[len(latencies) // 2] * 1000:.2f} ms / {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    for name in ('hits', 'stale_hits', 'misses', 'coalesced', 'upstream_avg_seconds', 'hit_ratio'):
+        print(f"{name + ':':<22}{stats[name]}")
+    fake.stop()
+
+
+if __name__ == '__main__':
+    main()
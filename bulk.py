@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from db import to_epoch
+from weather_cache import location_for, valid_coords
+
+EXPORT_COLUMNS = ('id', 'name', 'species', 'plant_type', 'last_watered', 'status', 'garden_id', 'city')
+MAX_REPORTED_ERRORS = 20
+SQLITE_MIN_INT, SQLITE_MAX_INT = -2 ** 63, 2 ** 63 - 1
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_lines(stream, block_size=1 << 16):
+    """Lines of a binary stream, each decoded on its own: a bad byte stops at its line, not its block."""
+    encoding = 'utf-8-sig'
+    pending = []
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        *lines, tail = block.split(b'\n')
+        for line in lines:
+            pending.append(line)
+            yield (b''.join(pending) + b'\n').decode(encoding)
+            pending = []
+            encoding = 'utf-8'
+        pending.append(tail)
+    rest = b''.join(pending)
+    if rest:
+        yield rest.decode(encoding)
+
+
+def iter_csv(stream):
+    reader = csv.DictReader(iter_lines(stream))
+    while True:
+        start = reader.line_num + 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # p. ej. un campo que supera csv.field_size_limit(): se salta esa fila
+            yield start, e
+            continue
+        yield reader.line_num, row
+
+
+def iter_ndjson(stream):
+    for line_num, line in enumerate(iter_lines(stream), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_num, json.loads(line)
+        except ValueError as e:
+            yield line_num, e
+
+
+def text_value(record, field):
+    value = record.get(field)
+    if value is None:
+        return ''
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"{field} must be a string")
+    return str(value).strip()
+
+
+def int_value(value, field):
+    """`value` as an int that fits in an SQLite INTEGER; ValueError otherwise (inf, nan, too large)."""
+    try:
+        value = int(value)
+    except OverflowError:
+        raise ValueError(f"{field} must be a finite number") from None
+    except ValueError:
+        raise ValueError(f"{field} must be an integer") from None
+    if not SQLITE_MIN_INT <= value <= SQLITE_MAX_INT:
+        raise ValueError(f"{field} is out of range")
+    return value
+
+
+def plant_values(record, now, default_location=None, garden_locations=None):
+    if isinstance(record, csv.Error):
+        raise ValueError(f"invalid CSV: {record}")
+    if isinstance(record, Exception):
+        raise ValueError(f"invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("expected an object per line")
+    name = text_value(record, 'name')
+    species = text_value(record, 'species')
+    if not name or not species:
+        raise ValueError("name and species are required")
+    plant_type = text_value(record, 'plant_type') or text_value(record, 'type') or None
+    last_watered = record.get('last_watered')
+    if last_watered in (None, ''):
+        last_watered = now
+    elif isinstance(last_watered, (int, float)):
+        last_watered = int_value(last_watered, 'last_watered')
+    else:
+        last_watered = to_epoch(last_watered)
+    garden_id = int_value(record.get('garden_id') or 1, 'garden_id')
+    city = text_value(record, 'city')
+    lat, lon = record.get('lat'), record.get('lon')
+    if lat not in (None, '') and lon not in (None, ''):
+        # 0 es una coordenada válida: se compara con None/'' y no por veracidad
+        city = location_for(city, *valid_coords(lat, lon))
+    elif city:
+        city = location_for(city)
+    else:
+        city = (garden_locations or {}).get(garden_id, default_location)
+    return name, species, plant_type, last_watered, garden_id, city
+
+
+def until_decode_error(records, summary):
+    line_num = 0
+    try:
+        for line_num, record in records:
+            yield line_num, record
+    except UnicodeDecodeError:
+        summary['error'] = f"file must be UTF-8 (stopped after line {line_num})"
+
+
+def import_plants(conn, records, chunk_size=1000, default_location=None):
+    """Insert (line_num, record) pairs in chunked transactions; bad rows are skipped and reported.
+
+    Rows without their own city or lat/lon take their garden's location. If a
+    line is not valid UTF-8, the rows before it are still committed and the
+    summary gets an 'error' key.
+    """
+    summary = {'imported': 0, 'skipped': 0, 'errors': []}
+    now = int(time.time())
+    garden_locations = dict(conn.execute('SELECT id, location FROM gardens').fetchall())
+    for chunk in chunked(until_decode_error(records, summary), chunk_size):
+        values = []
+        for line_num, record in chunk:
+            try:
+                values.append(plant_values(record, now, default_location, garden_locations))
+            except (ValueError, TypeError, OverflowError) as e:
+                summary['skipped'] += 1
+                if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                    summary['errors'].append({'line': line_num, 'error': str(e)})
+        with conn:
+            conn.executemany(
+                'INSERT INTO plants (name, species, plant_type, last_watered, garden_id, city) VALUES (?, ?, ?, ?, ?, ?)',
+                values
+            )
+        summary['imported'] += len(values)
+    return summary
+
+
+def parse_ids(ids):
+    if not isinstance(ids, list):
+        raise ValueError("ids must be a list")
+    # Sin conversiones: true, 2.7 o "5" no deben acabar borrando otra planta
+    if not all(type(i) is int and SQLITE_MIN_INT <= i <= SQLITE_MAX_INT for i in ids):
+        raise ValueError("ids must be integers")
+    return ids
+
+
+def execute_for_ids(conn, sql, params_for_id, ids, chunk_size=1000):
+    changed = 0
+    for chunk in chunked(ids, chunk_size):
+        with conn:
+            changed += conn.executemany(sql, (params_for_id(i) for i in chunk)).rowcount
+    return changed
+
+
+def water_plants(conn, ids, chunk_size=1000, now=None):
+    now = int(time.time()) if now is None else now
+    return execute_for_ids(conn, 'UPDATE plants SET last_watered = ? WHERE id = ?', lambda i: (now, i), ids, chunk_size)
+
+
+def delete_plants(conn, ids, chunk_size=1000):
+    return execute_for_ids(conn, 'DELETE FROM plants WHERE id = ?', lambda i: (i,), ids, chunk_size)
+
+
+def iter_plants(conn, chunk_size=1000):
+    after_id = 0
+    while True:
+        rows = conn.execute('SELECT * FROM plants WHERE id > ? ORDER BY id LIMIT ?', (after_id, chunk_size)).fetchall()
+        if not rows:
+            return
+        yield from rows
+        after_id = rows[-1]['id']
+
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for chunk in chunked(rows, 500):
+        for row in chunk:
+            writer.writerow([row[c] for c in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_ndjson(rows):
+    for chunk in chunked(rows, 500):
+        yield ''.join(json.dumps({c: row[c] for c in EXPORT_COLUMNS}, ensure_ascii=False) + '\n' for row in chunk)
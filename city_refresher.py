@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CityRefresher:
+    """Background fan-out: one weather fetch + one batch recompute per distinct location.
+
+    `locations_fn()` lists the locations that currently have plants and
+    `refresh_fn(location)` returns that location's summary dict. Pages read
+    the latest summaries through `overview()` and never touch upstream.
+    """
+
+    def __init__(self, locations_fn, refresh_fn, interval=300, max_workers=4):
+        self.locations_fn = locations_fn
+        self.refresh_fn = refresh_fn
+        self.interval = interval
+        self.max_workers = max_workers
+        self.last_run = None
+        self.last_duration = None
+        self._results = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='city-refresher', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print("City refresher exception:", e)
+            time.sleep(self.interval)
+
+    def run_once(self):
+        started = time.perf_counter()
+        locations = list(self.locations_fn())
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='city') as pool:
+            for location, summary in zip(locations, pool.map(self._refresh_one, locations)):
+                # Si falla una ciudad se conserva su último resumen
+                summary = summary or self.get(location)
+                if summary is not None:
+                    results[location] = summary
+        with self._lock:
+            self._results = results
+            self.last_run = time.time()
+            self.last_duration = time.perf_counter() - started
+        return results
+
+    def _refresh_one(self, location):
+        try:
+            return self.refresh_fn(location)
+        except Exception as e:
+            print("City refresh exception:", location, e)
+            return None
+
+    def overview(self):
+        with self._lock:
+            return {
+                'updated_at': self.last_run,
+                'refresh_seconds': self.last_duration,
+                'locations': sorted(self._results.values(), key=lambda s: -s['counts']['critical']),
+            }
+
+    def get(self, location):
+        with self._lock:
+            return self._results.get(location)
@@ -0,0 +1,220 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from metrics import track
+from weather_cache import location_for
+
+DB_PATH = os.getenv('LIFEPLANTS_DB', 'lifeplants.db')
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA cache_size = -20000',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA mmap_size = 268435456',
+)
+
+_local = threading.local()
+
+
+class TimedConnection(sqlite3.Connection):
+    """Records every execute/executemany in the dependency histogram, labelled by SQL verb.
+
+    SELECT rows are stepped lazily, so for reads this times the query up to its first row.
+    """
+
+    def execute(self, sql, *args):
+        with track('sqlite', sql.split(None, 1)[0].lower()):
+            return super().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        with track('sqlite', sql.split(None, 1)[0].lower()):
+            return super().executemany(sql, *args)
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or DB_PATH, timeout=5, check_same_thread=False, factory=TimedConnection)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_db_connection():
+    """One long-lived connection per thread (and per process, for gunicorn forks).
+
+    Callers must not close it; wrap writes in `with conn:` to commit or roll back.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        conn = connect()
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def to_epoch(value):
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except Exception:
+        return int(time.time())
+
+
+def _migrate_1(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS plants (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            species TEXT NOT NULL,
+            plant_type TEXT,
+            last_watered TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'happy'
+        )
+    ''')
+    # last_watered pasa de texto ISO a epoch entero; SQLite no permite cambiar
+    # el DEFAULT de una columna, así que se reconstruye la tabla.
+    conn.execute('''
+        CREATE TABLE plants_v1 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            species TEXT NOT NULL,
+            plant_type TEXT,
+            last_watered INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            status TEXT DEFAULT 'happy',
+            garden_id INTEGER NOT NULL DEFAULT 1,
+            city TEXT
+        )
+    ''')
+    rows = conn.execute('SELECT id, name, species, plant_type, last_watered, status FROM plants').fetchall()
+    conn.executemany(
+        'INSERT INTO plants_v1 (id, name, species, plant_type, last_watered, status) VALUES (?, ?, ?, ?, ?, ?)',
+        ((r['id'], r['name'], r['species'], r['plant_type'], to_epoch(r['last_watered']), r['status']) for r in rows)
+    )
+    conn.execute('DROP TABLE plants')
+    conn.execute('ALTER TABLE plants_v1 RENAME TO plants')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_plants_garden ON plants (garden_id, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_plants_city ON plants (city, id)')
+
+
+def _migrate_2(conn):
+    # Temperatura horaria por ciudad; `hour` = epoch // 3600
+    conn.execute('''
+        CREATE TABLE weather_history (
+            city TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            temp REAL NOT NULL,
+            source TEXT NOT NULL,
+            PRIMARY KEY (city, hour)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _migrate_3(conn):
+    # `location` es una ciudad normalizada o '@lat,lon'; plants.city guarda lo mismo
+    conn.execute('''
+        CREATE TABLE gardens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            location TEXT NOT NULL,
+            lat REAL,
+            lon REAL
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_gardens_location ON gardens (location)')
+
+
+def _migrate_4(conn):
+    # Registro de cambios de riego/ubicación: cada proceso pone al día su planificador
+    # en memoria leyendo solo lo nuevo (el status que escribe el refresher no cuenta)
+    conn.execute('''
+        CREATE TABLE plant_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            plant_id INTEGER NOT NULL,
+            changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER plants_log_insert AFTER INSERT ON plants
+        BEGIN INSERT INTO plant_changes (plant_id) VALUES (NEW.id); END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER plants_log_update AFTER UPDATE OF last_watered, city ON plants
+        BEGIN INSERT INTO plant_changes (plant_id) VALUES (NEW.id); END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER plants_log_delete AFTER DELETE ON plants
+        BEGIN INSERT INTO plant_changes (plant_id) VALUES (OLD.id); END
+    ''')
+
+
+def _migrate_5(conn):
+    # Las plantas existentes tienen garden_id = 1 por defecto: ese jardín debe existir antes del
+    # primer POST /gardens (mismo lugar que DEFAULT_CITY en app.py)
+    conn.execute("INSERT OR IGNORE INTO gardens (id, name, location) VALUES (1, 'Home', ?)", (location_for('Managua'),))
+
+
+MIGRATIONS = [_migrate_1, _migrate_2, _migrate_3, _migrate_4, _migrate_5]
+
+
+def init_db(conn=None):
+    conn = conn or get_db_connection()
+    while True:
+        # La versión se relee con el candado tomado: varios workers pueden arrancar a la vez
+        conn.execute('BEGIN IMMEDIATE')
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= len(MIGRATIONS):
+            conn.rollback()
+            break
+        try:
+            MIGRATIONS[version](conn)
+            conn.execute(f'PRAGMA user_version = {version + 1}')
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+    conn.execute('PRAGMA optimize')
+
+
+def fetch_plants(conn, garden_id=None, city=None, after_id=0, limit=None):
+    """Keyset-paginated plant listing served by the (garden_id, id) / (city, id) indexes."""
+    sql = 'SELECT * FROM plants WHERE id > ?'
+    params = [after_id]
+    if garden_id is not None:
+        sql += ' AND garden_id = ?'
+        params.append(garden_id)
+    if city is not None:
+        sql += ' AND city = ?'
+        params.append(city)
+    sql += ' ORDER BY id'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def plant_changes(conn, after_seq=0, limit=1000):
+    """Changes logged after `after_seq`, joined with each plant's current row (NULLs if deleted)."""
+    return conn.execute('''
+        SELECT c.seq, c.plant_id, p.id AS id, p.last_watered, p.city
+        FROM plant_changes c LEFT JOIN plants p ON p.id = c.plant_id
+        WHERE c.seq > ? ORDER BY c.seq LIMIT ?
+    ''', (after_seq, limit)).fetchall()
+
+
+def last_plant_change(conn):
+    return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM plant_changes').fetchone()[0]
+
+
+def prune_plant_changes(conn, before):
+    # Se conserva siempre la última fila: así un proceso que se quedó atrás ve el hueco y recarga
+    with conn:
+        conn.execute(
+            'DELETE FROM plant_changes WHERE changed_at < ? AND seq < (SELECT MAX(seq) FROM plant_changes)',
+            (before,)
+        )
@@ -0,0 +1,172 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Servidores falsos de OpenWeather y OpenAI para pruebas locales y benchmarks.
+# Nunca tocan la red: responden con datos sintéticos y latencia configurable.
+
+
+def fake_weather_payload(city=None, lat=None, lon=None):
+    seed = city or f"{lat},{lon}"
+    rng = random.Random(seed)
+    temp = round(rng.uniform(5, 38), 1)
+    main = rng.choice(['Clear', 'Clouds', 'Rain', 'Drizzle', 'Thunderstorm'])
+    return {
+        'coord': {'lat': float(lat or rng.uniform(-60, 60)), 'lon': float(lon or rng.uniform(-180, 180))},
+        'weather': [{'main': main, 'description': main.lower()}],
+        'main': {'temp': temp, 'humidity': rng.randint(20, 95)},
+        'name': (city or 'Somewhere').title(),
+    }
+
+
+def fake_series_payload(city, start, step, count):
+    rng = random.Random(city)
+    base = rng.uniform(10, 30)
+    # ciclo diario: máximo a media tarde
+    return {'list': [
+        {'dt': start + i * step, 'main': {'temp': round(base + 6 * math.sin((((start + i * step) // 3600) % 24 - 9) / 24 * 2 * math.pi), 1)}}
+        for i in range(count)
+    ]}
+
+
+def fake_chat_reply(prompt):
+    # Prompt por lotes: devuelve {"tips": {id: tip}} para cada planta listada
+    if 'Plants: [' in prompt:
+        plants = json.loads(prompt[prompt.index('Plants: [') + len('Plants: '):])
+        tips = {p['id']: f"Fake tip for {p['plant']} at {p['temp_c']}°C." for p in plants}
+        return json.dumps({'tips': tips})
+    return 'Fake tip: water early in the morning and check drainage.'
+
+
+def chat_completion(content, model):
+    return {
+        'id': 'chatcmpl-fake',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop',
+        }],
+        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+    }
+
+
+class FakeUpstream:
+    def __init__(self, latency=0.05, ai_latency=0.3, error_rate=0.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.ai_latency = ai_latency
+        self.error_rate = error_rate
+        self.calls = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, route):
+        with self._lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def simulate(self, route, latency):
+                upstream.count(route)
+                if latency:
+                    time.sleep(latency)
+                if upstream.error_rate and random.random() < upstream.error_rate:
+                    self.send_json(500, {'message': 'fake upstream error'})
+                    return False
+                return True
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                if parsed.path.endswith('/data/2.5/weather'):
+                    if not self.simulate('weather', upstream.latency):
+                        return
+                    if 'q' in query:
+                        self.send_json(200, fake_weather_payload(city=query['q']))
+                    elif 'lat' in query and 'lon' in query:
+                        self.send_json(200, fake_weather_payload(lat=query['lat'], lon=query['lon']))
+                    else:
+                        self.send_json(400, {'message': 'Nothing to geocode'})
+                    return
+                if parsed.path.endswith('/data/2.5/forecast'):
+                    if not self.simulate('forecast', upstream.latency):
+                        return
+                    start = int(time.time()) // 10800 * 10800
+                    self.send_json(200, fake_series_payload(query.get('q', ''), start, 10800, 40))
+                    return
+                if parsed.path.endswith('/history/city'):
+                    if not self.simulate('history', upstream.latency):
+                        return
+                    start = int(query['start']) // 3600 * 3600
+                    count = (int(query['end']) - start) // 3600 + 1
+                    self.send_json(200, fake_series_payload(query.get('q', ''), start, 3600, count))
+                    return
+                self.send_json(404, {'message': 'not found'})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if urlparse(self.path).path.endswith('/chat/completions'):
+                    if not self.simulate('chat', upstream.ai_latency):
+                        return
+                    prompt = body['messages'][-1]['content']
+                    self.send_json(200, chat_completion(fake_chat_reply(prompt), body.get('model', 'fake')))
+                    return
+                self.send_json(404, {'message': 'not found'})
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake OpenWeather and OpenAI servers for local testing.')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--ai-latency', type=float, default=0.3)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeUpstream(latency=args.latency, ai_latency=args.ai_latency, error_rate=args.error_rate, port=args.port)
+    print(f"Fake upstream listening on {fake.url}")
+    print(f"  OPENWEATHER_URL={fake.url}/data/2.5/weather")
+    print(f"  OPENWEATHER_FORECAST_URL={fake.url}/data/2.5/forecast")
+    print(f"  OPENWEATHER_HISTORY_URL={fake.url}/history/city")
+    print(f"  OPENAI_BASE_URL={fake.url}/v1")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
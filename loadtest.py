@@ -0,0 +1,148 @@
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from werkzeug.serving import BaseWSGIServer
+
+from fake_upstreams import FakeUpstream
+
+# Carga scriptada contra la app real (servidor HTTP con hilos) y upstreams falsos locales.
+# Reporta p50/p95/p99 y throughput por ruta; no toca la red.
+# Uso: python loadtest.py --requests 500 --concurrency 16 --latency 0.05 --ai-latency 0.3 --error-rate 0.05
+
+ROUTES = ('/', '/advice/stream', '/chatbot', '/add', '/water')
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Fixed worker pool (like gunicorn gthread) so per-thread DB connections are reused."""
+
+    multithread = True
+
+    def __init__(self, host, port, app, workers=16):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='worker')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def start_app(fake, db_path, workers):
+    os.environ['OPENWEATHER_URL'] = f"{fake.url}/data/2.5/weather"
+    os.environ['OPENWEATHER_FORECAST_URL'] = f"{fake.url}/data/2.5/forecast"
+    os.environ['OPENAI_BASE_URL'] = f"{fake.url}/v1"
+    os.environ['OPENWEATHER_API_KEY'] = 'loadtest'
+    os.environ['OPENAI_API_KEY'] = 'loadtest'
+    os.environ['LIFEPLANTS_DB'] = db_path
+    os.environ['CITY_REFRESH_INTERVAL'] = '0'
+    import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = PooledWSGIServer('127.0.0.1', 0, app.app, workers=workers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return app, server, f"http://127.0.0.1:{server.server_port}"
+
+
+def seed(app, plants, cities):
+    conn = app.get_db_connection()
+    now = int(time.time())
+    with conn:
+        conn.executemany(
+            'INSERT INTO plants (name, species, plant_type, last_watered, city) VALUES (?, ?, ?, ?, ?)',
+            ((f"Plant {i}", f"Species {i % 50}", 'Shrub', now - i * 60, app.location_for(cities[i % len(cities)]))
+             for i in range(plants))
+        )
+    return [row['id'] for row in conn.execute('SELECT id FROM plants')]
+
+
+def request_for(route, i, ids, cities):
+    city = cities[i % len(cities)]
+    if route == '/':
+        # Render bloqueante: clima, estado y consejo (ai_batch_advice) dentro de la misma petición
+        return 'GET', f'/?city={city}&progressive=0', {}
+    if route == '/advice/stream':
+        # Lo que pide el modo progresivo; se lee el stream hasta el evento 'done'
+        return 'GET', f'/advice/stream?city={city}', {}
+    if route == '/chatbot':
+        return 'POST', '/chatbot', {'json': {'message': f'How often should I water plant {i}?', 'city': city}}
+    if route == '/add':
+        return 'POST', '/add', {'data': {'name': f'Load {i}', 'species': 'Fern', 'type': 'Vine', 'city': city}}
+    return 'GET', f'/water/{ids[i % len(ids)]}', {}
+
+
+def run(base, route, total, concurrency, ids, cities):
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, kwargs = request_for(route, i, ids, cities)
+        started = time.perf_counter()
+        try:
+            ok = session.request(method, base + path, allow_redirects=False, timeout=30, **kwargs).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    latencies = np.array([r[0] for r in results]) * 1000
+    errors = sum(not r[1] for r in results)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return p50, p95, p99, total / elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test against local fake OpenWeather/OpenAI upstreams.')
+    parser.add_argument('--routes', nargs='+', choices=ROUTES, default=list(ROUTES))
+    parser.add_argument('--requests', type=int, default=500, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=16, help='app server threads')
+    parser.add_argument('--plants', type=int, default=200)
+    parser.add_argument('--cities', nargs='+', default=['Managua', 'Leon', 'Granada', 'Masaya'])
+    parser.add_argument('--latency', type=float, default=0.05, help='fake OpenWeather latency (s)')
+    parser.add_argument('--ai-latency', type=float, default=0.3, help='fake OpenAI latency (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of upstream calls that return 500')
+    parser.add_argument('--metrics', action='store_true', help='print the dependency lines from /metrics at the end')
+    args = parser.parse_args()
+
+    fake = FakeUpstream(latency=args.latency, ai_latency=args.ai_latency, error_rate=args.error_rate).start()
+    db_path = os.path.join(tempfile.mkdtemp(prefix='lifeplants-load-'), 'lifeplants.db')
+    app, server, base = start_app(fake, db_path, args.workers)
+    ids = seed(app, args.plants, args.cities)
+
+    print(f"upstream latency {args.latency * 1000:.0f} ms, ai {args.ai_latency * 1000:.0f} ms, "
+          f"error rate {args.error_rate:.0%}; {args.requests} requests/route at concurrency {args.concurrency}")
+    print(f"{'route':<14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}  errors")
+    for route in args.routes:
+        p50, p95, p99, rps, errors = run(base, route, args.requests, args.concurrency, ids, args.cities)
+        print(f"{route:<14} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {rps:>8.0f}  {errors}")
+    print("upstream calls:", dict(sorted(fake.calls.items())))
+
+    if args.metrics:
+        for line in requests.get(base + '/metrics', timeout=10).text.splitlines():
+            if line.startswith(('lifeplants_dependency_duration_seconds_count', 'lifeplants_dependency_duration_seconds_sum',
+                                'lifeplants_dependency_errors_total')):
+                print(line)
+    server.shutdown()
+    fake.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import time
+from datetime import datetime
+
+import numpy as np
+
+BASE_DECAY_RATE = 5        # % de humedad perdida por hora
+HEAT_THRESHOLD = 30        # °C a partir de los cuales se acelera la evaporación
+HEAT_MULTIPLIER = 2.5
+CRITICAL_BELOW = 30
+THIRSTY_BELOW = 60
+
+# Índice = (humedad >= 30) + (humedad >= 60)
+STATUSES = np.array(['critical', 'thirsty', 'happy'])
+
+
+def calculate_status_physics(last_watered, current_temp, now=None):
+    now = now or datetime.now()
+    try:
+        if isinstance(last_watered, (int, float)):
+            last_watered = datetime.fromtimestamp(last_watered)
+        else:
+            last_watered = datetime.fromisoformat(last_watered)
+    except Exception:
+        last_watered = now
+    hours_passed = (now - last_watered).total_seconds() / 3600
+    multiplier = HEAT_MULTIPLIER if current_temp > HEAT_THRESHOLD else 1.0
+    moisture_loss = hours_passed * BASE_DECAY_RATE * multiplier
+    current_humidity = max(0, 100 - moisture_loss)
+    if current_humidity < CRITICAL_BELOW:
+        status = 'critical'
+    elif current_humidity < THIRSTY_BELOW:
+        status = 'thirsty'
+    else:
+        status = 'happy'
+    return int(current_humidity), status
+
+
+def calculate_status_batch(last_watered_epochs, current_temps, decay_rates=BASE_DECAY_RATE, now=None):
+    """Vectorized calculate_status_physics for a whole garden (or many).
+
+    `last_watered_epochs` is an array of epoch seconds (NaN means "just now",
+    like an unparseable timestamp in the scalar version). `current_temps` and
+    `decay_rates` are scalars or per-plant arrays. Returns (humidity, codes)
+    where humidity is int64 and STATUSES[codes] gives the status names.
+    """
+    now = time.time() if now is None else now
+    last = np.asarray(last_watered_epochs, dtype=np.float64)
+    hours_passed = np.where(np.isnan(last), 0.0, now - last) / 3600
+    multiplier = np.where(np.asarray(current_temps) > HEAT_THRESHOLD, HEAT_MULTIPLIER, 1.0)
+    moisture_loss = hours_passed * np.asarray(decay_rates, dtype=np.float64) * multiplier
+    current_humidity = np.maximum(0, 100 - moisture_loss)
+    codes = (current_humidity >= CRITICAL_BELOW).astype(np.int8) + (current_humidity >= THIRSTY_BELOW)
+    return current_humidity.astype(np.int64), codes
+
+
+def threshold_crossings(last_watered_epoch, current_temp, decay_rate=BASE_DECAY_RATE):
+    """Epochs at which a plant turns thirsty (< 60 %) and critical (< 30 %)."""
+    multiplier = HEAT_MULTIPLIER if current_temp > HEAT_THRESHOLD else 1.0
+    seconds_per_point = 3600 / (decay_rate * multiplier)
+    return (
+        last_watered_epoch + (100 - THIRSTY_BELOW) * seconds_per_point,
+        last_watered_epoch + (100 - CRITICAL_BELOW) * seconds_per_point,
+    )
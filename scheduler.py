@@ -0,0 +1,135 @@
+import heapq
+import threading
+
+from weather_history import TemperatureSeries, threshold_crossings_integrated
+
+
+class _Plant:
+    __slots__ = ('id', 'city', 'last_watered', 'thirsty_at', 'critical_at', 'version')
+
+    def __init__(self, plant_id, city, last_watered):
+        self.id = plant_id
+        self.city = city
+        self.last_watered = last_watered
+        self.thirsty_at = None
+        self.critical_at = None
+        self.version = 0
+
+
+class WateringScheduler:
+    """Min-heap of plants ordered by the time they turn thirsty.
+
+    Crossing times come from each city's TemperatureSeries (the same hourly
+    model the dashboard uses, forecast included). Updates never rescan:
+    watering/adding a plant pushes one entry, a new series for a city
+    re-pushes only that city's plants. Superseded heap entries are skipped
+    lazily (each carries the plant's version number).
+    """
+
+    def __init__(self, default_temp=35):
+        self.default_series = TemperatureSeries(0, [], default_temp)
+        self._plants = {}
+        self._by_city = {}
+        self._series = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._plants)
+
+    def cities_without_series(self):
+        """Cities that have plants but were never given a series (they use `default_series`)."""
+        with self._lock:
+            return [city for city, ids in self._by_city.items() if ids and city not in self._series]
+
+    def clear(self):
+        """Forget every plant (temperatures are kept)."""
+        with self._lock:
+            self._plants.clear()
+            self._by_city.clear()
+            self._heap = []
+
+    def _push(self, plants):
+        # Un cálculo vectorizado por ciudad
+        by_city = {}
+        for plant in plants:
+            by_city.setdefault(plant.city, []).append(plant)
+        for city, group in by_city.items():
+            series = self._series.get(city, self.default_series)
+            thirsty, critical = threshold_crossings_integrated([p.last_watered for p in group], series)
+            for plant, thirsty_at, critical_at in zip(group, thirsty.tolist(), critical.tolist()):
+                plant.thirsty_at, plant.critical_at = thirsty_at, critical_at
+                plant.version += 1
+        if 2 * len(plants) > len(self._plants):
+            # Se re-calcula más de la mitad: reconstruir sale más barato que apilar duplicados
+            self._rebuild()
+            return
+        for plant in plants:
+            heapq.heappush(self._heap, (plant.thirsty_at, plant.id, plant.version))
+
+    def upsert_many(self, items):
+        """Add or update (plant_id, last_watered, city) tuples."""
+        with self._lock:
+            changed = {}
+            for plant_id, last_watered, city in items:
+                plant = self._plants.get(plant_id)
+                if plant is None:
+                    plant = self._plants[plant_id] = _Plant(plant_id, city, last_watered)
+                elif plant.city != city:
+                    self._by_city[plant.city].discard(plant_id)
+                    plant.city = city
+                plant.last_watered = last_watered
+                self._by_city.setdefault(city, set()).add(plant_id)
+                changed[plant_id] = plant
+            self._push(list(changed.values()))
+            self._compact()
+
+    def remove(self, plant_ids):
+        with self._lock:
+            for plant_id in plant_ids:
+                plant = self._plants.pop(plant_id, None)
+                if plant is not None:
+                    self._by_city[plant.city].discard(plant_id)
+
+    def set_series(self, series_by_city):
+        """Give cities a new TemperatureSeries ({city: series}) and re-time only their plants."""
+        with self._lock:
+            changed = [city for city, series in series_by_city.items() if self._series.get(city) is not series]
+            for city in changed:
+                self._series[city] = series_by_city[city]
+            self._push([self._plants[plant_id] for city in changed for plant_id in self._by_city.get(city, ())])
+            self._compact()
+
+    def _rebuild(self):
+        self._heap = [(p.thirsty_at, p.id, p.version) for p in self._plants.values()]
+        heapq.heapify(self._heap)
+
+    def _compact(self):
+        # Las entradas obsoletas se descartan al hacer pop; si dominan el heap, se reconstruye
+        if len(self._heap) > 2 * len(self._plants) + 64:
+            self._rebuild()
+
+    def due(self, n=10, until=None):
+        """Next `n` plants by thirsty time (overdue first), optionally only those due by `until`."""
+        results = []
+        keep = []
+        with self._lock:
+            while self._heap and len(results) < n:
+                entry = heapq.heappop(self._heap)
+                due_at, plant_id, version = entry
+                plant = self._plants.get(plant_id)
+                if plant is None or plant.version != version:
+                    continue
+                keep.append(entry)
+                if until is not None and due_at > until:
+                    break
+                results.append({
+                    'id': plant_id,
+                    'city': plant.city,
+                    'last_watered': plant.last_watered,
+                    'thirsty_at': plant.thirsty_at,
+                    'critical_at': plant.critical_at,
+                })
+            for entry in keep:
+                heapq.heappush(self._heap, entry)
+        return results
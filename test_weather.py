@@ -7,13 +7,15 @@ load_dotenv()
 # Securely get the API Key
 API_KEY = os.getenv("OPENWEATHER_API_KEY")
 CITY = "Managua"
+# Apunta a fake_upstreams.py para probar sin la API real
+URL = os.getenv("OPENWEATHER_URL", "http://api.openweathermap.org/data/2.5/weather")
 
 def get_weather():
     if not API_KEY:
         print(" Error: No API Key found. Please set OPENWEATHER_API_KEY in your .env file.")
         return
 
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={CITY}&appid={API_KEY}&units=metric&lang=en"
+    url = f"{URL}?q={CITY}&appid={API_KEY}&units=metric&lang=en"
     response = requests.get(url)
 
     if response.status_code == 200:
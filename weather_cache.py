@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def city_key(city_name):
+    return ('city', ' '.join((city_name or '').split()).casefold())
+
+
+def coord_key(lat, lon):
+    # ~1 km de resolución: clics cercanos en el mapa comparten entrada
+    return ('coord', round(float(lat), 2), round(float(lon), 2))
+
+
+def valid_coords(lat, lon):
+    """(lat, lon) as floats; ValueError/TypeError if they are not numbers on the globe."""
+    lat, lon = float(lat), float(lon)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat/lon out of range")
+    return lat, lon
+
+
+def location_for(city=None, lat=None, lon=None):
+    """Location string stored with plants/gardens: a normalized city name, or '@lat,lon'."""
+    if lat is not None and lon is not None:
+        _, lat, lon = coord_key(lat, lon)
+        return f"@{lat:.2f},{lon:.2f}"
+    return city_key(city)[1]
+
+
+def location_key(location):
+    if location.startswith('@'):
+        lat, lon = location[1:].split(',')
+        return coord_key(lat, lon)
+    return ('city', location)
+
+
+def key_location(key):
+    return f"@{key[1]:.2f},{key[2]:.2f}" if key[0] == 'coord' else key[1]
+
+
+class _Entry:
+    __slots__ = ('value', 'stored_at')
+
+    def __init__(self, value, stored_at):
+        self.value = value
+        self.stored_at = stored_at
+
+
+class WeatherCache:
+    """TTL + LRU cache with single-flight misses and stale-while-revalidate.
+
+    `fetch(key)` is called outside the lock and should return the upstream
+    payload or None on failure. None is never cached, so a failing upstream
+    keeps serving the last good value until `ttl + stale_ttl` runs out.
+    `on_update(key, value)` is called after every successful fetch.
+    """
+
+    def __init__(self, fetch, ttl=600, stale_ttl=1800, max_entries=256, clock=time.monotonic, on_update=None):
+        self.fetch = fetch
+        self.on_update = on_update
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'upstream_calls': 0,
+            'upstream_errors': 0,
+            'upstream_seconds': 0.0,
+            'upstream_max_seconds': 0.0,
+            'evictions': 0,
+        }
+
+    def get(self, key, block=True):
+        """Cached value for `key`; with block=False a miss returns None at once
+        and loads in the background instead of waiting on upstream."""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry.value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['stale_hits'] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = threading.Event()
+                        self._stats['refreshes'] += 1
+                        threading.Thread(target=self._load, args=(key,), daemon=True).start()
+                    return entry.value
+                del self._entries[key]
+            self._stats['misses'] += 1
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+                leader = True
+            else:
+                self._stats['coalesced'] += 1
+                leader = False
+            if not block:
+                if leader:
+                    threading.Thread(target=self._load, args=(key,), daemon=True).start()
+                return None
+        if leader:
+            return self._load(key)
+        event.wait()
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def _load(self, key):
+        started = time.perf_counter()
+        try:
+            value = self.fetch(key)
+        except Exception as e:
+            print("Weather cache fetch exception:", e)
+            value = None
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats['upstream_calls'] += 1
+            self._stats['upstream_seconds'] += elapsed
+            self._stats['upstream_max_seconds'] = max(self._stats['upstream_max_seconds'], elapsed)
+            if value is None:
+                self._stats['upstream_errors'] += 1
+            else:
+                self._store(key, value)
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+        if value is not None and self.on_update is not None:
+            self.on_update(key, value)
+        return value
+
+    def _store(self, key, value):
+        self._entries[key] = _Entry(value, self.clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['inflight'] = len(self._inflight)
+        calls = stats['upstream_calls']
+        stats['upstream_avg_seconds'] = stats['upstream_seconds'] / calls if calls else 0.0
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,175 @@
+import threading
+import time
+
+import numpy as np
+
+from physics import (BASE_DECAY_RATE, CRITICAL_BELOW, HEAT_MULTIPLIER, HEAT_THRESHOLD, THIRSTY_BELOW, calculate_status_batch,
+                     threshold_crossings)
+
+HOUR = 3600
+
+# Una observación real pisa a la historia, y ambas pisan al pronóstico
+SOURCE_PRIORITY = {'forecast': 0, 'history': 1, 'observed': 2}
+
+
+def hourly(points):
+    """(epoch, temp) samples at any spacing (3 h for the free forecast) -> {hour: temp}, linearly interpolated."""
+    points = sorted(points)
+    if not points:
+        return {}
+    epochs = np.array([p[0] for p in points], dtype=np.float64)
+    temps = np.array([p[1] for p in points], dtype=np.float64)
+    hours = np.arange(int(epochs[0] // HOUR), int(epochs[-1] // HOUR) + 1)
+    return dict(zip(hours.tolist(), np.interp(hours * HOUR, epochs, temps).tolist()))
+
+
+class TemperatureSeries:
+    """Hourly temperatures with a prefix integral of the evaporation multiplier.
+
+    `effective_seconds(t)` is the integral of multiplier(T) dt from the series
+    start, so the moisture lost between two instants is
+    (F(t1) - F(t0)) / 3600 * decay_rate: O(1) per plant after one cumsum.
+    Time outside the covered hours uses `fallback_temp` (the current reading).
+    """
+
+    def __init__(self, start_hour, temps, fallback_temp):
+        temps = np.asarray(temps, dtype=np.float64)
+        self.start = start_hour * HOUR
+        self.end = self.start + len(temps) * HOUR
+        self.multipliers = np.where(temps > HEAT_THRESHOLD, HEAT_MULTIPLIER, 1.0)
+        self.prefix = np.concatenate(([0.0], np.cumsum(self.multipliers * HOUR)))
+        self.fallback_temp = fallback_temp
+        self.fallback_multiplier = HEAT_MULTIPLIER if fallback_temp > HEAT_THRESHOLD else 1.0
+
+    def __len__(self):
+        return len(self.multipliers)
+
+    def effective_seconds(self, t):
+        t = np.asarray(t, dtype=np.float64)
+        if not len(self.multipliers):
+            return (t - self.start) * self.fallback_multiplier
+        inside = np.clip(t, self.start, self.end)
+        k = np.minimum((inside - self.start) // HOUR, len(self.multipliers) - 1).astype(np.int64)
+        within = self.prefix[k] + (inside - self.start - k * HOUR) * self.multipliers[k]
+        before = np.minimum(t - self.start, 0) * self.fallback_multiplier
+        after = np.maximum(t - self.end, 0) * self.fallback_multiplier
+        return np.where(t >= self.end, self.prefix[-1] + after, within + before)
+
+    def time_at(self, f):
+        """Inverse of effective_seconds: the instant at which it reaches `f`."""
+        f = np.asarray(f, dtype=np.float64)
+        if not len(self.multipliers):
+            return self.start + f / self.fallback_multiplier
+        k = np.clip(np.searchsorted(self.prefix, f, side='right') - 1, 0, len(self.multipliers) - 1)
+        within = self.start + k * HOUR + (f - self.prefix[k]) / self.multipliers[k]
+        before = self.start + f / self.fallback_multiplier
+        after = self.end + (f - self.prefix[-1]) / self.fallback_multiplier
+        return np.where(f < 0, before, np.where(f > self.prefix[-1], after, within))
+
+
+def calculate_status_integrated(last_watered_epochs, series, decay_rates=BASE_DECAY_RATE, now=None):
+    """calculate_status_batch, but each hour since watering uses that hour's temperature."""
+    now = time.time() if now is None else now
+    if not len(series):
+        # Sin historia: exactamente el modelo original con la lectura actual
+        return calculate_status_batch(last_watered_epochs, series.fallback_temp, decay_rates, now=now)
+    last = np.asarray(last_watered_epochs, dtype=np.float64)
+    last = np.where(np.isnan(last), now, last)
+    effective_hours = (series.effective_seconds(now) - series.effective_seconds(last)) / HOUR
+    moisture_loss = effective_hours * np.asarray(decay_rates, dtype=np.float64)
+    current_humidity = np.maximum(0, 100 - moisture_loss)
+    codes = (current_humidity >= CRITICAL_BELOW).astype(np.int8) + (current_humidity >= THIRSTY_BELOW)
+    return current_humidity.astype(np.int64), codes
+
+
+def threshold_crossings_integrated(last_watered_epochs, series, decay_rate=BASE_DECAY_RATE):
+    """threshold_crossings walked forward through the series (forecast hours included).
+
+    Matches calculate_status_integrated: a plant is still exactly at 60 % (30 %)
+    at the first (second) returned epoch and thirsty (critical) right after.
+    """
+    last = np.asarray(last_watered_epochs, dtype=np.float64)
+    if not len(series):
+        return threshold_crossings(last, series.fallback_temp, decay_rate)
+    base = series.effective_seconds(last)
+    return (
+        series.time_at(base + (100 - THIRSTY_BELOW) * HOUR / decay_rate),
+        series.time_at(base + (100 - CRITICAL_BELOW) * HOUR / decay_rate),
+    )
+
+
+class WeatherHistory:
+    """Hourly temperature per city, stored in the weather_history table.
+
+    In-memory state (data versions and built series) is kept per city until
+    `retain()` drops the cities that no longer have plants.
+    """
+
+    def __init__(self, get_conn, keep_days=14):
+        self.get_conn = get_conn
+        self.keep_days = keep_days
+        self._versions = {}
+        self._series = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def retain(self, cities):
+        """Forget the in-memory state of every city not in `cities`."""
+        cities = set(cities)
+        with self._lock:
+            for entries in (self._versions, self._series):
+                for city in [c for c in entries if c not in cities]:
+                    del entries[city]
+
+    def record(self, city, hourly_temps, source):
+        if not hourly_temps:
+            return
+        priority = SOURCE_PRIORITY[source]
+        conn = self.get_conn()
+        with conn:
+            conn.executemany(
+                '''INSERT INTO weather_history (city, hour, temp, source) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (city, hour) DO UPDATE SET temp = excluded.temp, source = excluded.source
+                   WHERE ? >= CASE weather_history.source WHEN 'observed' THEN 2 WHEN 'history' THEN 1 ELSE 0 END''',
+                ((city, hour, temp, source, priority) for hour, temp in hourly_temps.items())
+            )
+        with self._lock:
+            # Contador global: una ciudad desalojada y vuelta a ver nunca repite versión
+            self._counter += 1
+            self._versions[city] = self._counter
+
+    def observe(self, city, epoch, temp):
+        self.record(city, {int(epoch // HOUR): temp}, 'observed')
+
+    def prune(self, now=None):
+        now = time.time() if now is None else now
+        conn = self.get_conn()
+        with conn:
+            conn.execute('DELETE FROM weather_history WHERE hour < ?', (int(now // HOUR) - self.keep_days * 24,))
+
+    def series(self, city, fallback_temp, now=None):
+        """TemperatureSeries for `city` over the kept window; gaps are forward-filled."""
+        now = time.time() if now is None else now
+        # Se reconstruye al cambiar los datos, la lectura actual o la hora (otros workers también escriben)
+        with self._lock:
+            version = (self._versions.get(city, 0), fallback_temp, int(now // HOUR))
+            cached = self._series.get(city)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        since = int(now // HOUR) - self.keep_days * 24
+        rows = self.get_conn().execute(
+            'SELECT hour, temp FROM weather_history WHERE city = ? AND hour >= ? ORDER BY hour', (city, since)
+        ).fetchall()
+        if rows:
+            start = rows[0]['hour']
+            temps = np.full(rows[-1]['hour'] - start + 1, np.nan)
+            temps[[r['hour'] - start for r in rows]] = [r['temp'] for r in rows]
+            # forward-fill de huecos (horas sin lectura)
+            filled = np.where(np.isnan(temps), 0, np.arange(len(temps)))
+            temps = temps[np.maximum.accumulate(filled)]
+        else:
+            start, temps = int(now // HOUR), []
+        result = TemperatureSeries(start, temps, fallback_temp)
+        with self._lock:
+            self._series[city] = (version, result)
+        return result